@@ -0,0 +1,76 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUCache:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+
+local_tokens = LRUCache(
+    settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT
+)
+
+
+def get_shared_key(key):
+    return f'api:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_tokens(*keys):
+    local_tokens.delete(*keys)
+    if settings.TOKEN_CACHE_SHARED:
+        cache.delete_many([get_shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        credentials = local_tokens.get(key)
+        if credentials is None and settings.TOKEN_CACHE_SHARED:
+            credentials = cache.get(get_shared_key(key))
+            if credentials is not None:
+                local_tokens.set(key, credentials)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            local_tokens.set(key, credentials)
+            if settings.TOKEN_CACHE_SHARED:
+                cache.set(
+                    get_shared_key(key),
+                    credentials,
+                    settings.TOKEN_CACHE_SHARED_TIMEOUT
+                )
+        user, token = credentials
+        return copy.copy(user), token
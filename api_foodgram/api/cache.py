@@ -0,0 +1,95 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.constants import RESPONSE_CACHE_TIMEOUT
+from api.metrics import CACHE_REQUESTS
+
+
+def get_cache_version(namespace):
+    return cache.get_or_set(
+        f'api:version:{namespace}', time.time_ns, timeout=None
+    )
+
+
+def invalidate_cache(*namespaces):
+    cache.set_many(
+        {f'api:version:{namespace}': time.time_ns()
+         for namespace in namespaces},
+        timeout=None
+    )
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+    cache_timeout = RESPONSE_CACHE_TIMEOUT
+    cache_query_params = None
+    cache_anonymous_only = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_url(self, request):
+        if self.cache_query_params is None:
+            return request.build_absolute_uri()
+        params = request.query_params
+        if any(key not in self.cache_query_params for key in params):
+            return None
+        query = urlencode(sorted(
+            (key, value)
+            for key in params
+            for value in params.getlist(key)
+            if value
+        ))
+        return request.build_absolute_uri(f'{request.path}?{query}')
+
+    def cached_response(self, view, request, *args, **kwargs):
+        if self.cache_anonymous_only and request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        url = self.get_cache_url(request)
+        if url is None:
+            return view(request, *args, **kwargs)
+        version = get_cache_version(self.cache_namespace)
+        path = hashlib.md5(url.encode()).hexdigest()
+        etag = f'"{version}-{path}"'
+        last_modified = version // 10 ** 9
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            CACHE_REQUESTS.labels(self.cache_namespace, 'not_modified').inc()
+            return self.vary(not_modified)
+
+        cache_key = f'api:response:{self.cache_namespace}:{version}:{path}'
+        data = cache.get(cache_key)
+        CACHE_REQUESTS.labels(
+            self.cache_namespace, 'miss' if data is None else 'hit'
+        ).inc()
+        if data is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(cache_key, data, self.cache_timeout)
+
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return self.vary(response)
+
+    def vary(self, response):
+        if self.cache_anonymous_only:
+            patch_vary_headers(response, ('Authorization',))
+        return response
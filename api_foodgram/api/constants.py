@@ -0,0 +1,29 @@
+RECIPES_LIMIT_MAX: int = 100
+RESPONSE_CACHE_TIMEOUT: int = 60 * 60 * 24
+RECIPE_AUTHOR_FIELDS: tuple = (
+    'email', 'username', 'first_name', 'last_name'
+)
+INGREDIENT_SEARCH_LIMIT: int = 50
+PDF_PAGE_SIZE: tuple = (595, 842)
+PDF_MARGIN: int = 50
+PDF_FONT_SIZE: int = 11
+PDF_LEADING: int = 16
+PDF_LINES_PER_PAGE: int = (PDF_PAGE_SIZE[1] - 2 * PDF_MARGIN) // PDF_LEADING
+PDF_FONT_NAME: str = 'ShoppingCartFont'
+PDF_FALLBACK_FONT: str = 'Helvetica'
+THUMBNAIL_WIDTHS: tuple = (320, 640, 1280)
+THUMBNAIL_FORMATS: dict = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+THUMBNAIL_QUALITY: int = 80
+IMAGE_UPLOAD_MAX_SIZE: int = 20 * 1024 * 1024
+IMAGE_UPLOAD_TOKEN_MAX_AGE: int = 60 * 60 * 24
+IMAGE_SIGNATURES: dict = {
+    'jpeg': ((0, b'\xff\xd8\xff'),),
+    'png': ((0, b'\x89PNG\r\n\x1a\n'),),
+    'gif': ((0, b'GIF8'),),
+    'webp': ((0, b'RIFF'), (8, b'WEBP')),
+}
+DB_QUERY_BUCKETS: tuple = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+IMAGE_UPLOAD_BUCKETS: tuple = (
+    64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024,
+    10 * 1024 * 1024, IMAGE_UPLOAD_MAX_SIZE
+)
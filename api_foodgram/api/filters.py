@@ -1,26 +1,48 @@
 import django_filters
-from rest_framework.filters import SearchFilter
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from rest_framework.filters import OrderingFilter, SearchFilter
 
+from api.cache import get_cache_version
+from api.constants import INGREDIENT_SEARCH_LIMIT, RESPONSE_CACHE_TIMEOUT
+from api.search import ingredient_index
 from recipes.models import Recipe, Tag
 
 
+def get_tag_ids():
+    cache_key = f'api:tag_ids:{get_cache_version("tags")}'
+    tag_ids = cache.get(cache_key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(cache_key, tag_ids, RESPONSE_CACHE_TIMEOUT)
+    return tag_ids
+
+
 class RecipeFilter(django_filters.FilterSet):
     is_favorited = django_filters.NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = django_filters.NumberFilter(
         method='filter_is_in_shopping_cart'
     )
-    tags = django_filters.filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
-        lookup_expr='icontains',
-        conjoined=False
+    tags = django_filters.MultipleChoiceFilter(
+        choices=lambda: [(slug, slug) for slug in get_tag_ids()],
+        method='filter_tags'
     )
 
     class Meta:
         model = Recipe
         fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=[tag_ids[slug] for slug in value]
+            )
+        ))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorited_by__user=self.request.user)
@@ -34,5 +56,25 @@ class RecipeFilter(django_filters.FilterSet):
         return queryset
 
 
+class StableOrderingFilter(OrderingFilter):
+    tiebreakers = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        fields = {field.lstrip('-') for field in ordering}
+        return (*ordering, *(
+            field for field in self.tiebreakers
+            if field.lstrip('-') not in fields
+        ))
+
+
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        prefix = request.query_params.get(self.search_param, '').strip()
+        if not prefix or view.action != 'list':
+            return super().filter_queryset(request, queryset, view)
+        return ingredient_index.search(prefix, INGREDIENT_SEARCH_LIMIT)
@@ -0,0 +1,145 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from api.cache import invalidate_cache
+from api.constants import (IMAGE_UPLOAD_TOKEN_MAX_AGE, THUMBNAIL_FORMATS,
+                           THUMBNAIL_QUALITY, THUMBNAIL_WIDTHS)
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+logger = logging.getLogger(__name__)
+
+executor = None
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-images'
+        )
+    return executor
+
+
+def thumbnail_name(image_name, width, extension):
+    stem = os.path.basename(image_name).replace('.', '_')
+    return f'recipes/thumbnails/{stem}_{width}.{extension}'
+
+
+def get_widths(original_width):
+    widths = [width for width in THUMBNAIL_WIDTHS if width < original_width]
+    return widths or [original_width]
+
+
+def make_thumbnails(image_name, overwrite=False):
+    with recipe_image_storage.open(image_name, 'rb') as image_file:
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert(
+            'RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB'
+        )
+    thumbnails = {}
+    for width in get_widths(image.width):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for extension, image_format in THUMBNAIL_FORMATS.items():
+            name = thumbnail_name(image_name, width, extension)
+            sizes = thumbnails.setdefault(extension, {})
+            if default_storage.exists(name):
+                if not overwrite:
+                    sizes[str(width)] = name
+                    continue
+                default_storage.delete(name)
+            frame = resized
+            if image_format == 'JPEG' and frame.mode == 'RGBA':
+                frame = Image.new('RGB', frame.size, 'white')
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            frame.save(
+                buffer, image_format, quality=THUMBNAIL_QUALITY, optimize=True
+            )
+            sizes[str(width)] = default_storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+    return thumbnails
+
+
+def process_recipe_image(recipe_id, image_name, overwrite=False):
+    try:
+        thumbnails = make_thumbnails(image_name, overwrite)
+        if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            thumbnails=thumbnails
+        ):
+            invalidate_cache('recipes')
+    except Exception:
+        logger.exception(
+            'Не удалось обработать картинку рецепта %s', recipe_id
+        )
+
+
+def process_in_worker(recipe_id, image_name):
+    try:
+        process_recipe_image(recipe_id, image_name)
+    finally:
+        connections.close_all()
+
+
+def schedule_thumbnails(recipe):
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        transaction.on_commit(
+            lambda: process_recipe_image(recipe_id, image_name)
+        )
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(
+            process_in_worker, recipe_id, image_name
+        )
+    )
+
+
+def release_recipe_image(image_name, thumbnails):
+    if not image_name or Recipe.objects.filter(image=image_name).exists():
+        return False
+    if recipe_image_storage.exists(image_name) and (
+        recipe_image_storage.get_modified_time(image_name)
+        > timezone.now() - timedelta(seconds=IMAGE_UPLOAD_TOKEN_MAX_AGE)
+    ):
+        return False
+    recipe_image_storage.delete(image_name)
+    for sizes in thumbnails.values():
+        for name in sizes.values():
+            default_storage.delete(name)
+    return True
+
+
+def schedule_release(image_name, thumbnails):
+    transaction.on_commit(
+        lambda: release_recipe_image(image_name, thumbnails)
+    )
+
+
+def build_srcset(request, thumbnails):
+    srcset = {}
+    for extension, sizes in thumbnails.items():
+        urls = []
+        for width, name in sorted(
+            sizes.items(), key=lambda item: int(item[0])
+        ):
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.append(f'{url} {width}w')
+        srcset[extension] = ', '.join(urls)
+    return srcset
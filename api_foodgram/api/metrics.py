@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from api.constants import DB_QUERY_BUCKETS, IMAGE_UPLOAD_BUCKETS
+
+REQUESTS = Counter(
+    'api_requests_total',
+    'Число запросов к API.',
+    ('view', 'method', 'status')
+)
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds',
+    'Время обработки запроса к API.',
+    ('view',)
+)
+DB_QUERIES = Histogram(
+    'api_db_queries',
+    'Число SQL-запросов на один запрос к API.',
+    ('view',),
+    buckets=DB_QUERY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'api_cache_requests_total',
+    'Обращения к кешу ответов API.',
+    ('namespace', 'result')
+)
+SHOPPING_LIST_DURATION = Histogram(
+    'api_shopping_list_duration_seconds',
+    'Время формирования списка покупок.',
+    ('format',)
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'api_image_upload_bytes',
+    'Размер загруженных картинок рецептов.',
+    buckets=IMAGE_UPLOAD_BUCKETS
+)
+
+
+def observe_request(view, method, status, duration, queries):
+    REQUESTS.labels(view, method, status).inc()
+    REQUEST_DURATION.labels(view).observe(duration)
+    DB_QUERIES.labels(view).observe(queries)
+
+
+def timed_iterator(iterable, file_format):
+    started = time.perf_counter()
+    try:
+        yield from iterable
+    finally:
+        SHOPPING_LIST_DURATION.labels(file_format).observe(
+            time.perf_counter() - started
+        )
+
+
+def get_registry():
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    return HttpResponse(
+        generate_latest(get_registry()),
+        content_type=CONTENT_TYPE_LATEST
+    )
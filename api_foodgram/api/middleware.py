@@ -0,0 +1,176 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from api.metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0
+        self.serializer_time = 0
+        self.handler_started = None
+        self.view_name = None
+        self.view_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    def start_handler(self):
+        self.handler_started = (time.perf_counter(), self.db_time)
+
+    def finish_handler(self):
+        if self.handler_started is None:
+            return
+        started, db_time = self.handler_started
+        self.serializer_time += (
+            time.perf_counter() - started - (self.db_time - db_time)
+        )
+        self.handler_started = None
+
+    def duplicates(self, threshold):
+        return [
+            {'sql': sql[:200], 'count': count}
+            for sql, count in self.queries.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ServerTimingMixin:
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timing = current_timing.get()
+        if timing is not None:
+            timing.start_handler()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.finish_handler()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def get_view_name(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    method = request.method.lower()
+    action = getattr(view_func, 'actions', {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.duplicate_threshold = settings.REQUEST_TIMING_DUPLICATE_THRESHOLD
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        request.timing = timing
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        total = time.perf_counter() - started
+        view_time = (
+            time.perf_counter() - timing.view_started
+            if timing.view_started is not None else total
+        )
+
+        query_count = sum(timing.queries.values())
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timing.db_time * 1000:.1f};desc="{query_count} queries"',
+            f'serializer;dur={timing.serializer_time * 1000:.1f}',
+            f'view;dur={view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        duplicates = timing.duplicates(self.duplicate_threshold)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': timing.view_name,
+            'status': response.status_code,
+            'queries': query_count,
+            'db_ms': round(timing.db_time * 1000, 1),
+            'serializer_ms': round(timing.serializer_time * 1000, 1),
+            'view_ms': round(view_time * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }
+        if duplicates:
+            record['duplicate_queries'] = duplicates
+        logger.log(
+            logging.WARNING if duplicates else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.view_name = get_view_name(request, view_func)
+            timing.view_started = time.perf_counter()
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        request.metrics_view = 'unresolved'
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        observe_request(
+            request.metrics_view,
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            queries.count
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(request, view_func)
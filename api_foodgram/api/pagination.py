@@ -1,6 +1,167 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class CachedCountPaginator(Paginator):
+    estimated = False
+
+    def get_planner_estimate(self, sql, params):
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        connection = connections[self.object_list.db]
+        if not threshold or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = int(plan[0]['Plan']['Plan Rows'])
+        return rows if rows >= threshold else None
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.values('pk').order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        cache_key = 'api:count:' + hashlib.md5(
+            f'{sql}{params!r}'.encode()
+        ).hexdigest()
+        cached = cache.get(cache_key)
+        if cached is None:
+            estimate = self.get_planner_estimate(sql, params)
+            if estimate is None:
+                cached = (queryset.count(), False)
+            else:
+                cached = (estimate, True)
+            cache.set(
+                cache_key, cached, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        count, self.estimated = cached
+        return count
+
+
+class CachedCountPagination(CustomPagination):
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.page.paginator.estimated:
+            response.data['count_estimated'] = True
+        return response
+
+
+class FeedPagination(CachedCountPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_ordering = getattr(view, 'cursor_ordering', None)
+        if (
+            self.cursor_ordering is None
+            or self.cursor_query_param not in request.query_params
+        ):
+            self.cursor_ordering = None
+            return super().paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise ValidationError({api_settings.ORDERING_PARAM: [
+                'Сортировка недоступна при выводе по курсору.'
+            ]})
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(
+            *(f'-{field}' for field in self.cursor_ordering)
+        )
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = [
+                getattr(page[-1], field) for field in self.cursor_ordering
+            ]
+        return page
+
+    def get_keyset_filter(self, position):
+        return reduce(or_, (
+            reduce(and_, (
+                Q(**{field: value})
+                for field, value in zip(self.cursor_ordering, position[:index])
+            ), Q(**{f'{self.cursor_ordering[index]}__lt': position[index]}))
+            for index in range(len(self.cursor_ordering))
+        ))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.cursor_ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        encoded = urlsafe_b64encode(
+            json.dumps(position, cls=CursorEncoder).encode()
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_ordering is None:
+            return super().get_paginated_response(data)
+        next_link = None
+        if self.next_position is not None:
+            next_link = self.encode_cursor(self.next_position)
+        return Response({'next': next_link, 'results': data})
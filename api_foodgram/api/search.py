@@ -0,0 +1,50 @@
+import threading
+from bisect import bisect_left
+
+from api.cache import get_cache_version
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ((), ())
+
+    def refresh(self):
+        version = get_cache_version('ingredients')
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            items = sorted(
+                (name.casefold(), name, measurement_unit, ingredient_id)
+                for ingredient_id, name, measurement_unit
+                in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                )
+            )
+            self._index = (tuple(item[0] for item in items), tuple(items))
+            self._version = version
+
+    def search(self, prefix, limit):
+        self.refresh()
+        keys, items = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        results = []
+        for key, name, measurement_unit, ingredient_id in items[
+            start:start + limit
+        ]:
+            if not key.startswith(prefix):
+                break
+            results.append(Ingredient(
+                id=ingredient_id,
+                name=name,
+                measurement_unit=measurement_unit
+            ))
+        return results
+
+
+ingredient_index = IngredientIndex()
@@ -1,23 +1,43 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.images import build_srcset
+from api.uploads import read_upload_token
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartItem, Tag,
+                            detach_cart_items)
 from users.models import Subscription
 
 User = get_user_model()
 
 
+class ImageSrcsetMixin:
+    def get_srcset(self, obj):
+        return build_srcset(self.context.get('request'), obj.thumbnails)
+
+
 class IsSubscribedMixin:
+    def get_subscribed_authors(self):
+        subscribed_authors = self.context.get('subscribed_authors')
+        if subscribed_authors is None:
+            subscribed_authors = set(
+                self.context['request'].user.subscriptions.values_list(
+                    'author_id', flat=True
+                )
+            )
+            self.context['subscribed_authors'] = subscribed_authors
+        return subscribed_authors
+
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        user = request.user
-        return (
+        return bool(
             request
-            and user.is_authenticated
-            and user.subscribing.filter(author=obj).exists()
+            and request.user.is_authenticated
+            and obj.id in self.get_subscribed_authors()
         )
 
 
@@ -59,10 +79,7 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -70,7 +87,31 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeStatusMixin:
+    def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        request = self.context.get('request')
+        return (
+            request
+            and request.user.is_authenticated
+            and obj.favorited_by.filter(user=request.user).exists()
+        )
+
+    def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        request = self.context.get('request')
+        return (
+            request
+            and request.user.is_authenticated
+            and obj.added_to_shopping_carts.filter(user=request.user).exists()
+        )
+
+
+class RecipeListSerializer(
+    RecipeStatusMixin, ImageSrcsetMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True, read_only=True)
     author = ProfileSerializer(read_only=True)
     ingredients = IngredientInRecipeSerializer(
@@ -79,29 +120,77 @@ class RecipeListSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    srcset = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author',
                   'ingredients', 'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text',
+                  'name', 'image', 'srcset', 'text',
                   'cooking_time')
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        return (
-            request
-            and request.user.is_authenticated
-            and obj.favorited_by.filter(user=request.user).exists()
-        )
 
-    def get_is_in_shopping_cart(self, obj):
+class RecipeReadSerializer(
+    RecipeStatusMixin, IsSubscribedMixin, ImageSrcsetMixin,
+    serializers.BaseSerializer
+):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_data = {}
+        self.author_data = {}
+
+    def get_tag(self, tag):
+        if tag.id not in self.tag_data:
+            self.tag_data[tag.id] = {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+        return self.tag_data[tag.id]
+
+    def get_author(self, author):
+        if author.id not in self.author_data:
+            self.author_data[author.id] = {
+                'email': author.email,
+                'id': author.id,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'is_subscribed': self.get_is_subscribed(author),
+            }
+        return self.author_data[author.id]
+
+    def get_image(self, image):
+        if not image:
+            return None
         request = self.context.get('request')
-        return (
-            request
-            and request.user.is_authenticated
-            and obj.added_to_shopping_carts.filter(user=request.user).exists()
-        )
+        if request is None:
+            return image.url
+        return request.build_absolute_uri(image.url)
+
+    def to_representation(self, instance):
+        return {
+            'id': instance.id,
+            'tags': [self.get_tag(tag) for tag in instance.tags.all()],
+            'author': self.get_author(instance.author),
+            'ingredients': [
+                {
+                    'id': item.ingredient.id,
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in instance.ingredients_in_recipe.all()
+            ],
+            'is_favorited': self.get_is_favorited(instance),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(instance),
+            'name': instance.name,
+            'image': self.get_image(instance.image),
+            'srcset': self.get_srcset(instance),
+            'text': instance.text,
+            'cooking_time': instance.cooking_time,
+        }
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -110,30 +199,96 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         many=True
     )
     ingredients = IngredientAmountSerializer(many=True)
-    image = Base64ImageField()
+    image = Base64ImageField(required=False)
+    image_token = serializers.CharField(write_only=True, required=False)
     author = ProfileSerializer(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'ingredients',
-                  'name', 'image', 'text',
+                  'name', 'image', 'image_token', 'text',
                   'cooking_time', 'author')
 
     @staticmethod
     def ingredients_create(recipe, ingredients):
-        for ingredient_data in ingredients:
-            IngredientInRecipe.objects.create(
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
                 recipe=recipe,
                 ingredient=ingredient_data['ingredient'],
                 amount=ingredient_data['amount']
             )
+            for ingredient_data in ingredients
+        )
 
     @staticmethod
-    def tags_create(recipe, tags):
-        for tag in tags:
-            recipe.tags.add(tag)
+    def ingredients_update(recipe, ingredients):
+        existing = {
+            ingredient_in_recipe.ingredient_id: ingredient_in_recipe
+            for ingredient_in_recipe in IngredientInRecipe.objects.filter(
+                recipe_id=recipe.id
+            )
+        }
+        to_create = []
+        to_update = []
+        deltas = {}
+        for ingredient_data in ingredients:
+            ingredient_id = ingredient_data['ingredient'].id
+            ingredient_in_recipe = existing.pop(ingredient_id, None)
+            if ingredient_in_recipe is None:
+                to_create.append(ingredient_data)
+                deltas[ingredient_id] = ingredient_data['amount']
+            elif ingredient_in_recipe.amount != ingredient_data['amount']:
+                deltas[ingredient_id] = (
+                    ingredient_data['amount'] - ingredient_in_recipe.amount
+                )
+                ingredient_in_recipe.amount = ingredient_data['amount']
+                to_update.append(ingredient_in_recipe)
+        for ingredient_id, ingredient_in_recipe in existing.items():
+            deltas[ingredient_id] = -ingredient_in_recipe.amount
+
+        if existing:
+            with detach_cart_items(recipe.id):
+                IngredientInRecipe.objects.filter(
+                    id__in=[item.id for item in existing.values()]
+                ).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        RecipeWriteSerializer.ingredients_create(recipe, to_create)
+        ShoppingCartItem.objects.apply_recipe_changes(recipe.id, deltas)
+
+    def validate_ingredients(self, value):
+        ingredients = Ingredient.objects.in_bulk(
+            {ingredient_data['id'] for ingredient_data in value}
+        )
+        for ingredient_data in value:
+            if ingredient_data['id'] not in ingredients:
+                raise serializers.ValidationError(
+                    f'Недопустимый первичный ключ "{ingredient_data["id"]}"'
+                    ' - объект не существует.'
+                )
+        return [
+            {
+                'ingredient': ingredients[ingredient_data['id']],
+                'amount': ingredient_data['amount']
+            }
+            for ingredient_data in value
+        ]
+
+    def validate_image_token(self, value):
+        image = read_upload_token(self.context['request'].user, value)
+        if image is None:
+            raise serializers.ValidationError(
+                'Недействительный токен загрузки картинки.'
+            )
+        return image
 
     def validate(self, data):
+        if 'image_token' in data:
+            data['image'] = data.pop('image_token')
+        elif 'image' not in data and not self.partial:
+            raise serializers.ValidationError(
+                {'image': ['Обязательное поле.']}
+            )
         ingredients = data['ingredients']
         for ingredient in ingredients:
             amount = ingredient['amount']
@@ -143,39 +298,45 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         author = self.context.get('request').user
         recipe = Recipe.objects.create(author=author, **validated_data)
 
-        self.tags_create(recipe, tags)
+        recipe.tags.set(tags)
         self.ingredients_create(recipe, ingredients)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        Recipe.objects.select_for_update().only('pk').get(pk=instance.pk)
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
 
-        instance.tags.clear()
-        self.tags_create(instance, tags_data)
-
-        IngredientInRecipe.objects.filter(recipe=instance).delete()
-        self.ingredients_create(instance, ingredients_data)
-
+        instance.tags.set(tags_data)
+        self.ingredients_update(instance, ingredients_data)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        prefetch_related_objects(
+            [instance], 'ingredients_in_recipe__ingredient', 'tags'
+        )
         return RecipeListSerializer(instance, context=context).data
 
 
-class RecipeRepresentationSerializer(serializers.ModelSerializer):
+class RecipeRepresentationSerializer(
+    ImageSrcsetMixin, serializers.ModelSerializer
+):
+    srcset = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'srcset', 'cooking_time')
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -265,8 +426,12 @@ class SubscriptionListSerializer(
     IsSubscribedMixin,
     serializers.ModelSerializer
 ):
-    recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes = RecipeRepresentationSerializer(
+        many=True,
+        read_only=True,
+        source='limited_recipes'
+    )
+    recipes_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -277,15 +442,3 @@ class SubscriptionListSerializer(
             'recipes', 'recipes_count'
         )
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
-
-    def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.GET.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-
-        return RecipeRepresentationSerializer(recipes, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
@@ -0,0 +1,250 @@
+import csv
+import os
+import zlib
+from itertools import chain
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import (FF_NONSYMBOLIC, FF_SYMBOLIC, SUBSETN,
+                                       TTFont, makeToUnicodeCMap)
+
+from api.constants import (PDF_FALLBACK_FONT, PDF_FONT_NAME, PDF_FONT_SIZE,
+                           PDF_LEADING, PDF_LINES_PER_PAGE, PDF_MARGIN,
+                           PDF_PAGE_SIZE)
+from api.metrics import timed_iterator
+
+
+def format_item(ingredient):
+    return (
+        f'{ingredient["ingredient__name"]} '
+        f'{ingredient["ingredient__measurement_unit"]}, '
+        f'- {ingredient["amount"]}'
+    )
+
+
+def shopping_cart_txt(ingredients):
+    for ingredient in ingredients:
+        yield f'{format_item(ingredient)}\n'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount']
+        ))
+
+
+def get_pdf_font():
+    font_path = settings.SHOPPING_CART_PDF_FONT
+    if not os.path.isfile(font_path):
+        return None
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return pdfmetrics.getFont(PDF_FONT_NAME)
+
+
+class StreamingPDFWriter:
+    def __init__(self, font=None):
+        self.font = font
+        self.offsets = {}
+        self.position = 0
+        self.next_id = 4
+        self.pages = []
+
+    def emit(self, data):
+        self.position += len(data)
+        return data
+
+    def allocate(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def write_object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        return self.emit(
+            f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+        )
+
+    def write_stream(self, object_id, content, extra=''):
+        return self.write_object(
+            object_id,
+            f'<< /Length {len(content)}{extra} >>\nstream\n'.encode()
+            + content + b'\nendstream'
+        )
+
+    def start(self):
+        return self.emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def split_line(self, line):
+        if self.font is None:
+            return [('F1', line.encode('cp1252', errors='replace'))]
+        return [
+            (f'F1+{subset}', data)
+            for subset, data in self.font.splitString(line, self)
+        ]
+
+    def write_page(self, lines):
+        commands = ['BT']
+        for row, line in enumerate(lines):
+            commands.append(
+                f'1 0 0 1 {PDF_MARGIN} '
+                f'{PDF_PAGE_SIZE[1] - PDF_MARGIN - row * PDF_LEADING} Tm'
+            )
+            commands.extend(
+                f'/{name} {PDF_FONT_SIZE} Tf <{data.hex()}> Tj'
+                for name, data in self.split_line(line)
+            )
+        commands.append('ET')
+        content_id = self.allocate()
+        page_id = self.allocate()
+        self.pages.append(page_id)
+        return self.write_stream(
+            content_id,
+            zlib.compress('\n'.join(commands).encode()),
+            ' /Filter /FlateDecode'
+        ) + self.write_object(
+            page_id,
+            f'<< /Type /Page /Parent 2 0 R '
+            f'/MediaBox [0 0 {PDF_PAGE_SIZE[0]} {PDF_PAGE_SIZE[1]}] '
+            f'/Resources 3 0 R /Contents {content_id} 0 R >>'.encode()
+        )
+
+    def write_fallback_font(self):
+        font_id = self.allocate()
+        return {'F1': font_id}, self.write_object(
+            font_id,
+            f'<< /Type /Font /Subtype /Type1 /BaseFont /{PDF_FALLBACK_FONT} '
+            f'/Encoding /WinAnsiEncoding >>'.encode()
+        )
+
+    def write_subset(self, number, subset):
+        face = self.font.face
+        base_font = (
+            SUBSETN(number) + b'+' + face.name + face.subfontNameX
+        ).decode()
+        font_file = face.makeSubset(subset)
+        font_file_id = self.allocate()
+        cmap_id = self.allocate()
+        descriptor_id = self.allocate()
+        font_id = self.allocate()
+        widths = ' '.join(
+            str(round(face.getCharWidth(code))) for code in subset
+        )
+        bbox = ' '.join(str(round(value)) for value in face.bbox)
+        flags = face.flags & ~FF_NONSYMBOLIC | FF_SYMBOLIC
+        return font_id, b''.join((
+            self.write_stream(
+                font_file_id,
+                zlib.compress(font_file),
+                f' /Length1 {len(font_file)} /Filter /FlateDecode'
+            ),
+            self.write_stream(
+                cmap_id, makeToUnicodeCMap(base_font, subset).encode()
+            ),
+            self.write_object(
+                descriptor_id,
+                f'<< /Type /FontDescriptor /FontName /{base_font} '
+                f'/Flags {flags} /FontBBox [{bbox}] '
+                f'/ItalicAngle {face.italicAngle} /Ascent {face.ascent} '
+                f'/Descent {face.descent} /CapHeight {face.capHeight} '
+                f'/StemV {face.stemV} /FontFile2 {font_file_id} 0 R >>'
+                .encode()
+            ),
+            self.write_object(
+                font_id,
+                f'<< /Type /Font /Subtype /TrueType /BaseFont /{base_font} '
+                f'/FirstChar 0 /LastChar {len(subset) - 1} '
+                f'/Widths [{widths}] /FontDescriptor {descriptor_id} 0 R '
+                f'/ToUnicode {cmap_id} 0 R >>'.encode()
+            ),
+        ))
+
+    def write_fonts(self):
+        if self.font is None:
+            return self.write_fallback_font()
+        state = self.font.state.pop(self, None)
+        fonts, data = {}, []
+        for number, subset in enumerate(state.subsets if state else ()):
+            fonts[f'F1+{number}'], chunk = self.write_subset(number, subset)
+            data.append(chunk)
+        return fonts, b''.join(data)
+
+    def finish(self):
+        fonts, data = self.write_fonts()
+        font_refs = ' '.join(
+            f'/{name} {font_id} 0 R' for name, font_id in fonts.items()
+        )
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.pages)
+        data += self.write_object(
+            3, f'<< /Font << {font_refs} >> >>'.encode()
+        ) + self.write_object(
+            2,
+            f'<< /Type /Pages /Kids [{kids}] '
+            f'/Count {len(self.pages)} >>'.encode()
+        ) + self.write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref_position = self.position
+        xref = [f'xref\n0 {self.next_id}\n0000000000 65535 f \n']
+        xref.extend(
+            f'{self.offsets[object_id]:010d} 00000 n \n'
+            for object_id in range(1, self.next_id)
+        )
+        xref.append(
+            f'trailer\n<< /Size {self.next_id} /Root 1 0 R >>\n'
+            f'startxref\n{xref_position}\n%%EOF\n'
+        )
+        return data + self.emit(''.join(xref).encode())
+
+    def close(self):
+        if self.font is not None:
+            self.font.state.pop(self, None)
+
+
+def shopping_cart_pdf(ingredients):
+    writer = StreamingPDFWriter(get_pdf_font())
+    lines = chain(
+        ('Список покупок', ''),
+        (format_item(ingredient) for ingredient in ingredients)
+    )
+    try:
+        yield writer.start()
+        page = []
+        for line in lines:
+            page.append(line)
+            if len(page) == PDF_LINES_PER_PAGE:
+                yield writer.write_page(page)
+                page = []
+        if page:
+            yield writer.write_page(page)
+        yield writer.finish()
+    finally:
+        writer.close()
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', shopping_cart_txt),
+    'csv': ('text/csv; charset=utf-8', shopping_cart_csv),
+    'pdf': ('application/pdf', shopping_cart_pdf),
+}
+
+
+def shopping_cart_response(ingredients, file_format):
+    content_type, writer = SHOPPING_CART_FORMATS[file_format]
+    response = StreamingHttpResponse(
+        timed_iterator(writer(ingredients), file_format),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_cart.{file_format}"'
+    )
+    return response
@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_tokens
+from api.cache import invalidate_cache
+from api.constants import RECIPE_AUTHOR_FIELDS
+from api.images import schedule_release, schedule_thumbnails
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+
+def invalidate_recipes_cache():
+    transaction.on_commit(lambda: invalidate_cache('recipes'))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_cache('tags', 'recipes'))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_cache(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_cache('ingredients', 'recipes'))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_cache(sender, **kwargs):
+    invalidate_recipes_cache()
+
+
+def get_author_fields(instance):
+    if instance.get_deferred_fields() & set(RECIPE_AUTHOR_FIELDS):
+        return None
+    return tuple(getattr(instance, field) for field in RECIPE_AUTHOR_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_author_fields(sender, instance, **kwargs):
+    instance.previous_author_fields = (
+        get_author_fields(instance) if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cache(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    previous = instance.previous_author_fields
+    current = get_author_fields(instance)
+    instance.previous_author_fields = current
+    if created or (
+        update_fields is not None
+        and not set(update_fields) & set(RECIPE_AUTHOR_FIELDS)
+    ):
+        return
+    if previous is None or current is None or previous != current:
+        invalidate_recipes_cache()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created or (
+        update_fields is not None and set(update_fields) <= {'last_login'}
+    ):
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    if keys:
+        transaction.on_commit(lambda: invalidate_tokens(*keys))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_tokens(instance.key))
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_recipe_image(sender, instance, **kwargs):
+    schedule_release(instance.image.name, instance.thumbnails)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, raw=False, update_fields=None,
+                            **kwargs):
+    instance.previous_image = None
+    if (
+        raw
+        or instance.pk is None
+        or update_fields is not None and 'image' not in update_fields
+    ):
+        return
+    instance.previous_image = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('image', 'thumbnails').first()
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    if not created:
+        previous = getattr(instance, 'previous_image', None)
+        if previous is None or previous[0] == instance.image.name:
+            return
+        Recipe.objects.filter(pk=instance.pk).update(thumbnails={})
+        instance.thumbnails = {}
+        schedule_release(*previous)
+    schedule_thumbnails(instance)
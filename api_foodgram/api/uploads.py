@@ -0,0 +1,138 @@
+import hashlib
+import os
+import uuid
+
+from django.core import signing
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FileUploadParser
+
+from api.constants import (IMAGE_SIGNATURES, IMAGE_UPLOAD_MAX_SIZE,
+                           IMAGE_UPLOAD_TOKEN_MAX_AGE)
+from api.metrics import IMAGE_UPLOAD_BYTES
+from recipes.storage import recipe_image_storage
+
+UPLOAD_TOKEN_SALT = 'api.uploads.recipe-image'
+UPLOAD_FIELD_NAMES = (None, 'image', 'file')
+
+
+def detect_extension(header):
+    for extension, signatures in IMAGE_SIGNATURES.items():
+        for offset, signature in signatures:
+            if header[offset:offset + len(signature)] != signature:
+                break
+        else:
+            return extension
+    return None
+
+
+class RawImageUploadParser(FileUploadParser):
+    media_type = '*/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(
+            stream, media_type, parser_context
+        ) or 'image'
+
+
+class RecipeImageUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.storage_name = None
+        self.file = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        if self.storage_name is not None or field_name not in (
+            UPLOAD_FIELD_NAMES
+        ):
+            raise SkipFile()
+        super().new_file(field_name, *args, **kwargs)
+        if self.content_length and self.content_length > (
+            IMAGE_UPLOAD_MAX_SIZE
+        ):
+            self.fail('Файл слишком большой.')
+        self.size = 0
+        self.header = b''
+        self.digest = hashlib.sha256()
+        self.path = recipe_image_storage.path(
+            f'recipes/uploads/{uuid.uuid4().hex}.part'
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'wb')
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('Файл слишком большой.')
+        if len(self.header) < 16:
+            self.header += raw_data[:16]
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.file.close()
+        extension = detect_extension(self.header)
+        if extension is None:
+            self.fail('Загрузите изображение JPEG, PNG, GIF или WEBP.')
+        try:
+            with Image.open(self.path) as image:
+                image_format = image.format.lower()
+        except (OSError, Image.DecompressionBombError):
+            self.fail('Файл повреждён или не является изображением.')
+        if image_format != extension:
+            self.fail('Содержимое файла не соответствует формату.')
+
+        name = recipe_image_storage.hashed_name(
+            f'recipes/image.{extension}', self.digest.hexdigest()
+        )
+        if recipe_image_storage.exists(name):
+            os.remove(self.path)
+            os.utime(recipe_image_storage.path(name))
+        else:
+            path = recipe_image_storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.path, path)
+        self.storage_name = name
+        IMAGE_UPLOAD_BYTES.observe(self.size)
+        return UploadedFile(
+            recipe_image_storage.open(name),
+            name=name,
+            content_type=f'image/{extension}',
+            size=self.size
+        )
+
+    def upload_interrupted(self):
+        self.cleanup()
+
+    def cleanup(self):
+        if self.file is not None:
+            self.file.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def fail(self, message):
+        self.cleanup()
+        raise ValidationError({'image': [message]})
+
+
+def make_upload_token(user, name):
+    return signing.dumps(
+        {'user': user.pk, 'image': name}, salt=UPLOAD_TOKEN_SALT
+    )
+
+
+def read_upload_token(user, token):
+    try:
+        payload = signing.loads(
+            token, salt=UPLOAD_TOKEN_SALT, max_age=IMAGE_UPLOAD_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    if payload['user'] != user.pk or not recipe_image_storage.exists(
+        payload['image']
+    ):
+        return None
+    return payload['image']
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.metrics import metrics_view
 from api.views import (IngredientViewSet, ProfileViewSet, RecipeViewSet,
                        TagViewSet)
 
@@ -13,6 +14,7 @@ router.register('users', ProfileViewSet, basename='users')
 app_name = 'api'
 
 urlpatterns = [
+    path('metrics', metrics_view, name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
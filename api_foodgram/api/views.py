@@ -1,53 +1,115 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Subquery,
+                              Value)
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from api.filters import IngredientSearchFilter, RecipeFilter
-from api.pagination import CustomPagination
+from api.cache import CachedResponseMixin
+from api.constants import RECIPES_LIMIT_MAX
+from api.filters import (IngredientSearchFilter, RecipeFilter,
+                         StableOrderingFilter)
+from api.middleware import ServerTimingMixin
+from api.pagination import FeedPagination
 from api.permissions import IsAdminAuthorOrReadOnly
+from api.renderers import (ShoppingCartCSVRenderer, ShoppingCartPDFRenderer,
+                           ShoppingCartTextRenderer)
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
-                             ProfileSerializer, RecipeListSerializer,
+                             ProfileSerializer, RecipeReadSerializer,
                              RecipeWriteSerializer, ShoppingCartSerializer,
                              SubscriptionListSerializer,
                              SubscriptionWriteSerializer, TagSerializer)
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+from api.shopping_cart import SHOPPING_CART_FORMATS, shopping_cart_response
+from api.uploads import (RawImageUploadParser, RecipeImageUploadHandler,
+                         make_upload_token)
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartItem, Tag)
 from users.models import Subscription, User
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ServerTimingMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_namespace = 'tags'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ServerTimingMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
+    cache_namespace = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ServerTimingMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     queryset = Recipe.objects.select_related('author').prefetch_related(
         'ingredients_in_recipe__ingredient', 'tags'
     ).all()
     permission_classes = (IsAdminAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
     filterset_class = RecipeFilter
-    pagination_class = CustomPagination
+    ordering_fields = ('pub_date', 'favorites_count', 'cart_count')
+    pagination_class = FeedPagination
+    cursor_ordering = ('pub_date', 'id')
+    cache_namespace = 'recipes'
+    cache_anonymous_only = True
+    cache_query_params = ('tags', 'author', 'page', 'limit')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        )
 
     def get_serializer_class(self):
         if self.request.method in ['GET']:
-            return RecipeListSerializer
+            return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='images',
+        permission_classes=[IsAuthenticated],
+        parser_classes=[MultiPartParser, RawImageUploadParser]
+    )
+    def upload_image(self, request):
+        handler = RecipeImageUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        if not request.FILES or handler.storage_name is None:
+            return Response(
+                {'image': ['Файл не был отправлен.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'image': make_upload_token(request.user, handler.storage_name)},
+            status=status.HTTP_201_CREATED
+        )
+
     @staticmethod
     def create_instance(serializer, request, pk):
         data = {
@@ -63,8 +125,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def delete_instance(model, request, pk):
         model_instance = model.objects.filter(user=request.user.id, recipe=pk)
 
-        deleted = model_instance.delete()[0]
-        if deleted:
+        if model_instance.delete()[0]:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Объекта для удаления не существует'},
@@ -80,6 +141,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.create_instance(FavoriteSerializer, request, pk)
 
     @favorite.mapping.delete
+    @transaction.atomic
     def delete_favorite(self, request, pk):
         return self.delete_instance(Favorite, request, pk)
 
@@ -92,48 +154,77 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.create_instance(ShoppingCartSerializer, request, pk)
 
     @shopping_cart.mapping.delete
+    @transaction.atomic
     def delete_shopping_cart(self, request, pk):
         return self.delete_instance(ShoppingCart, request, pk)
 
-    def create_shopping_cart_file(self, shopping_cart):
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_cart.txt"')
-
-        for item, amount in shopping_cart.items():
-            response.write(f'{item}, - {amount}\n')
-
-        return response
-
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=(
+            JSONRenderer,
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartPDFRenderer
+        )
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__added_to_shopping_carts__user=request.user
+        ingredients = ShoppingCartItem.objects.filter(
+            user=request.user
         ).values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-
-        shopping_cart = {}
-        for ingredient in ingredients:
-            item = (
-                f'{ingredient["ingredient__name"]} '
-                f'{ingredient["ingredient__measurement_unit"]}'
-            )
-            shopping_cart[item] = ingredient['amount']
+            'ingredient__measurement_unit',
+            amount=F('total_amount')
+        ).order_by('ingredient__name')
 
-        return self.create_shopping_cart_file(shopping_cart)
+        file_format = request.accepted_renderer.format
+        if file_format not in SHOPPING_CART_FORMATS:
+            file_format = 'txt'
+        return shopping_cart_response(ingredients.iterator(), file_format)
 
 
-class ProfileViewSet(UserViewSet):
+class ProfileViewSet(ServerTimingMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
+
+    @property
+    def cursor_ordering(self):
+        if self.action == 'subscriptions':
+            return ('subscription_id',)
+        return None
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return None
+        field = serializers.IntegerField(
+            min_value=1,
+            max_value=RECIPES_LIMIT_MAX
+        )
+        try:
+            return field.run_validation(recipes_limit)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError(
+                {'recipes_limit': error.detail}
+            )
+
+    def annotate_subscriptions(self, queryset):
+        recipes = Recipe.objects.only('id', 'name', 'image', 'thumbnails',
+                                      'cooking_time', 'author_id')
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            latest_recipes = Recipe.objects.filter(
+                author=OuterRef('author')
+            ).order_by('-pub_date', '-id').values('id')[:recipes_limit]
+            recipes = recipes.filter(id__in=Subquery(latest_recipes))
+        return queryset.annotate(
+            recipes_count=Count('recipes')
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
 
     @action(
         detail=True,
@@ -157,7 +248,9 @@ class ProfileViewSet(UserViewSet):
             serializer.save()
 
             list_serializer = SubscriptionListSerializer(
-                author,
+                self.annotate_subscriptions(
+                    User.objects.filter(id=author.id)
+                ).get(),
                 context={'request': request}
             )
             return Response(
@@ -183,7 +276,11 @@ class ProfileViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(subscribing__user=request.user)
+        queryset = self.annotate_subscriptions(
+            User.objects.filter(subscribing__user=request.user).annotate(
+                subscription_id=F('subscribing__id')
+            )
+        ).order_by('username')
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionListSerializer(
             page,
@@ -18,12 +18,10 @@ class IngredientAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'favorites_count')
     list_filter = ('author', 'name', 'tags')
+    readonly_fields = ('favorites_count', 'cart_count', 'thumbnails')
     inlines = (RecipeIngredientInLine,)
     empty_value_display = '-пусто-'
 
-    def favorites_count(self, obj):
-        return obj.favorited_by.count()
-
 
 admin.site.register(Favorite)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -0,0 +1,562 @@
+import base64
+import json
+import math
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import urls
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingCartItem, Tag)
+from recipes.storage import recipe_image_storage
+from users.models import Subscription
+
+User = get_user_model()
+
+PASSWORD = 'Benchmark-pass-2023'
+
+SCENARIOS = (
+    ('api-root', 'api-root', 2),
+    ('tags-list', 'tags-list', 3),
+    ('tags-detail', 'tags-detail', 3),
+    ('ingredients-list', 'ingredients-list', 3),
+    ('ingredients-detail', 'ingredients-detail', 3),
+    ('recipes-list-anonymous', 'recipes-list', 6),
+    ('recipes-list', 'recipes-list', 8),
+    ('recipes-list-filtered', 'recipes-list', 11),
+    ('recipes-list-cursor', 'recipes-list', 7),
+    ('recipes-detail', 'recipes-detail', 7),
+    ('recipes-upload-image', 'recipes-upload-image', 2),
+    ('recipes-create', 'recipes-list', 18),
+    ('recipes-update', 'recipes-detail', 24),
+    ('recipes-favorite', 'recipes-favorite', 8),
+    ('recipes-unfavorite', 'recipes-favorite', 5),
+    ('recipes-shopping-cart', 'recipes-shopping-cart', 14),
+    ('recipes-download-shopping-cart', 'recipes-download-shopping-cart', 3),
+    ('recipes-remove-from-shopping-cart', 'recipes-shopping-cart', 11),
+    ('recipes-delete', 'recipes-detail', 18),
+    ('users-list', 'users-list', 5),
+    ('users-create', 'users-list', 4),
+    ('users-detail', 'users-detail', 4),
+    ('users-me', 'users-me', 3),
+    ('users-set-password', 'users-set-password', 3),
+    ('users-subscriptions', 'users-subscriptions', 6),
+    ('users-subscribe', 'users-subscribe', 10),
+    ('users-unsubscribe', 'users-subscribe', 5),
+    ('login', 'login', 4),
+    ('logout', 'logout', 4),
+    ('metrics', 'metrics', 0),
+)
+
+SKIPPED_ROUTES = {
+    'users-activation': 'активация по почте отключена',
+    'users-resend-activation': 'активация по почте отключена',
+    'users-reset-password': 'отправляет письмо',
+    'users-reset-password-confirm': 'требует ссылку из письма',
+    'users-reset-username': 'отправляет письмо',
+    'users-reset-username-confirm': 'требует ссылку из письма',
+    'users-set-username': 'меняет email, по которому входит тестовый '
+                          'пользователь',
+}
+
+
+def get_route_names(patterns, seen=None):
+    seen = set() if seen is None else seen
+    names = []
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            names.extend(get_route_names(pattern.url_patterns, seen))
+            continue
+        regex = str(pattern.pattern)
+        if regex in seen or '(?P<format>' in regex:
+            continue
+        seen.add(regex)
+        names.append(pattern.name)
+    return names
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def make_png():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет тестовую базу синтетическими данными, проходит по всем '
+        'маршрутам API и проверяет число запросов к БД, задержку и память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes-per-user', type=int, default=10)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--cart', type=int, default=10)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--cache',
+            action='store_true',
+            help='Использовать локальный кеш вместо отключённого.'
+        )
+        parser.add_argument(
+            '--json',
+            help='Сохранить результаты в JSON-файл.'
+        )
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(
+                email=f'user{number}@benchmark.local',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password
+            )
+            for number in range(options['users'])
+        )
+        users = list(User.objects.order_by('id'))
+        Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', color='#E26C2D', slug=f'tag{number}')
+            for number in range(options['tags'])
+        )
+        tags = list(Tag.objects.order_by('id'))
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number:05d}', measurement_unit='г')
+            for number in range(options['ingredients'])
+        )
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+
+        image = recipe_image_storage.save(
+            'recipes/benchmark.png', ContentFile(self.png)
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {author.id}-{number}',
+                text='Описание рецепта. ' * 20,
+                cooking_time=rng.randint(1, 120),
+                image=image
+            )
+            for author in users
+            for number in range(options['recipes_per_user'])
+        )
+        recipes = list(Recipe.objects.values_list('id', 'author_id'))
+        recipe_ids = [recipe_id for recipe_id, _ in recipes]
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+            for recipe_id in recipe_ids
+            for tag in rng.sample(tags, rng.randint(1, len(tags)))
+        )
+        IngredientInRecipe.objects.bulk_create(
+            (
+                IngredientInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(
+                    ingredients, options['ingredients_per_recipe']
+                )
+            ),
+            batch_size=1000
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, author=author)
+            for user in users
+            for author in rng.sample(
+                [other for other in users if other != user],
+                options['subscriptions']
+            )
+        )
+        for model, count in (
+            (Favorite, options['favorites']),
+            (ShoppingCart, options['cart'])
+        ):
+            model.objects.bulk_create(
+                (
+                    model(user=user, recipe_id=recipe_id)
+                    for user in users
+                    for recipe_id in rng.sample(recipe_ids, count)
+                ),
+                batch_size=1000
+            )
+        ShoppingCartItem.objects.rebuild()
+        call_command('reconcile_recipe_counters', stdout=StringIO())
+
+        self.user = users[0]
+        self.token = Token.objects.create(user=self.user).key
+        self.tags = tags
+        self.ingredients = ingredients
+        self.recipe_ids = recipe_ids
+        used = set(
+            Favorite.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )
+        ) | set(
+            ShoppingCart.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )
+        )
+        self.fresh_recipes = [
+            recipe_id for recipe_id, author_id in recipes
+            if recipe_id not in used and author_id != self.user.id
+        ]
+        subscribed = set(
+            self.user.subscriptions.values_list('author_id', flat=True)
+        )
+        self.fresh_authors = [
+            user.id for user in users[1:] if user.id not in subscribed
+        ]
+        self.created_recipes = []
+        if min(
+            len(self.fresh_recipes), len(self.fresh_authors)
+        ) < options['iterations']:
+            raise CommandError(
+                'Слишком маленький набор данных для заданного числа '
+                'итераций: увеличьте --users или уменьшите --subscriptions, '
+                '--favorites и --cart.'
+            )
+
+    def recipe_payload(self, number):
+        return {
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': number + 1}
+                for ingredient_id in self.ingredients[number:number + 10]
+            ],
+            'name': f'Новый рецепт {number}',
+            'image': self.image,
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    def scenario_api_root(self, number):
+        return {'path': '/api/'}
+
+    def scenario_metrics(self, number):
+        return {'path': '/api/metrics'}
+
+    def scenario_tags_list(self, number):
+        return {'path': '/api/tags/'}
+
+    def scenario_tags_detail(self, number):
+        return {'path': f'/api/tags/{self.tags[0].id}/'}
+
+    def scenario_ingredients_list(self, number):
+        return {'path': '/api/ingredients/?name=ингредиент 001'}
+
+    def scenario_ingredients_detail(self, number):
+        return {'path': f'/api/ingredients/{self.ingredients[number]}/'}
+
+    def scenario_recipes_list_anonymous(self, number):
+        return {'path': '/api/recipes/?limit=24', 'anonymous': True}
+
+    def scenario_recipes_list(self, number):
+        return {'path': '/api/recipes/?limit=24&page=2'}
+
+    def scenario_recipes_list_filtered(self, number):
+        return {
+            'path': f'/api/recipes/?tags={self.tags[0].slug}'
+                    f'&tags={self.tags[1].slug}&is_favorited=1&limit=24'
+        }
+
+    def scenario_recipes_list_cursor(self, number):
+        return {'path': '/api/recipes/?cursor=&limit=24'}
+
+    def scenario_recipes_detail(self, number):
+        return {'path': f'/api/recipes/{self.recipe_ids[number]}/'}
+
+    def scenario_recipes_upload_image(self, number):
+        return {
+            'method': 'post',
+            'path': '/api/recipes/images/',
+            'data': self.png,
+            'content_type': 'image/png',
+        }
+
+    def scenario_recipes_create(self, number):
+        return {
+            'method': 'post',
+            'path': '/api/recipes/',
+            'data': self.recipe_payload(number),
+            'format': 'json',
+        }
+
+    def scenario_recipes_update(self, number):
+        payload = self.recipe_payload(number + 1)
+        del payload['image']
+        return {
+            'method': 'patch',
+            'path': f'/api/recipes/{self.created_recipes[number]}/',
+            'data': payload,
+            'format': 'json',
+        }
+
+    def scenario_recipes_favorite(self, number):
+        return {
+            'method': 'post',
+            'path': f'/api/recipes/{self.fresh_recipes[number]}/favorite/',
+        }
+
+    def scenario_recipes_unfavorite(self, number):
+        return {
+            'method': 'delete',
+            'path': f'/api/recipes/{self.fresh_recipes[number]}/favorite/',
+        }
+
+    def scenario_recipes_shopping_cart(self, number):
+        return {
+            'method': 'post',
+            'path': f'/api/recipes/{self.fresh_recipes[number]}'
+                    '/shopping_cart/',
+        }
+
+    def scenario_recipes_download_shopping_cart(self, number):
+        return {
+            'path': '/api/recipes/download_shopping_cart/',
+            'accept': 'text/plain',
+        }
+
+    def scenario_recipes_remove_from_shopping_cart(self, number):
+        return {
+            'method': 'delete',
+            'path': f'/api/recipes/{self.fresh_recipes[number]}'
+                    '/shopping_cart/',
+        }
+
+    def scenario_recipes_delete(self, number):
+        return {
+            'method': 'delete',
+            'path': f'/api/recipes/{self.created_recipes[number]}/',
+        }
+
+    def scenario_users_list(self, number):
+        return {'path': '/api/users/?limit=24'}
+
+    def scenario_users_create(self, number):
+        return {
+            'method': 'post',
+            'path': '/api/users/',
+            'data': {
+                'email': f'new{number}@benchmark.local',
+                'username': f'new{number}',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'password': PASSWORD,
+            },
+            'format': 'json',
+            'anonymous': True,
+        }
+
+    def scenario_users_detail(self, number):
+        return {'path': f'/api/users/{self.fresh_authors[number]}/'}
+
+    def scenario_users_me(self, number):
+        return {'path': '/api/users/me/'}
+
+    def scenario_users_set_password(self, number):
+        return {
+            'method': 'post',
+            'path': '/api/users/set_password/',
+            'data': {
+                'current_password': PASSWORD,
+                'new_password': PASSWORD,
+            },
+            'format': 'json',
+        }
+
+    def scenario_users_subscriptions(self, number):
+        return {'path': '/api/users/subscriptions/?limit=12&recipes_limit=3'}
+
+    def scenario_users_subscribe(self, number):
+        return {
+            'method': 'post',
+            'path': f'/api/users/{self.fresh_authors[number]}/subscribe/',
+        }
+
+    def scenario_users_unsubscribe(self, number):
+        return {
+            'method': 'delete',
+            'path': f'/api/users/{self.fresh_authors[number]}/subscribe/',
+        }
+
+    def scenario_login(self, number):
+        return {
+            'method': 'post',
+            'path': '/api/auth/token/login/',
+            'data': {'email': self.user.email, 'password': PASSWORD},
+            'format': 'json',
+            'anonymous': True,
+        }
+
+    def scenario_logout(self, number):
+        user = User.objects.get(pk=self.fresh_authors[number])
+        Token.objects.filter(user=user).delete()
+        return {
+            'method': 'post',
+            'path': '/api/auth/token/logout/',
+            'token': Token.objects.create(user=user).key,
+        }
+
+    def send(self, spec):
+        client = APIClient()
+        if not spec.get('anonymous'):
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {spec.get("token", self.token)}'
+            )
+        extra = {}
+        if 'accept' in spec:
+            extra['HTTP_ACCEPT'] = spec['accept']
+        for key in ('format', 'content_type'):
+            if key in spec:
+                extra[key] = spec[key]
+        response = getattr(client, spec.get('method', 'get'))(
+            spec['path'], spec.get('data'), **extra
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def run_scenario(self, label, iterations):
+        builder = getattr(self, f'scenario_{label.replace("-", "_")}')
+        queries = 0
+        latencies = []
+        peak = 0
+        for number in range(iterations):
+            spec = builder(number)
+            if number == 0:
+                tracemalloc.start()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.send(spec)
+                elapsed = time.perf_counter() - started
+            if number == 0:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{label}: {spec["path"]} вернул '
+                    f'{response.status_code}: {response.content[:200]!r}'
+                )
+            if label == 'recipes-create':
+                self.created_recipes.append(response.json()['id'])
+            queries = max(queries, len(context.captured_queries))
+            if number or iterations == 1:
+                latencies.append(elapsed * 1000)
+        return {
+            'queries': queries,
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def check_coverage(self):
+        covered = {route for _, route, _ in SCENARIOS}
+        missing = [
+            name for name in get_route_names(urls.urlpatterns)
+            if name not in covered and name not in SKIPPED_ROUTES
+        ]
+        if missing:
+            raise CommandError(
+                'Нет сценариев для маршрутов: ' + ', '.join(missing)
+            )
+
+    def benchmark(self, options):
+        self.seed(options)
+        results = {}
+        failures = []
+        self.stdout.write(
+            f'{"сценарий":36} {"запросы":>9} {"p50, мс":>9} '
+            f'{"p95, мс":>9} {"пик, КиБ":>9}'
+        )
+        for label, _, budget in SCENARIOS:
+            result = self.run_scenario(label, options['iterations'])
+            result['budget'] = budget
+            results[label] = result
+            line = (
+                f'{label:36} {result["queries"]:>4}/{budget:<4} '
+                f'{result["p50_ms"]:>9} {result["p95_ms"]:>9} '
+                f'{result["peak_kib"]:>9}'
+            )
+            if result['queries'] > budget:
+                failures.append(label)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return results, failures
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Число итераций должно быть положительным')
+        recipes = options['users'] * options['recipes_per_user']
+        if (
+            options['subscriptions'] >= options['users']
+            or max(options['favorites'], options['cart']) > recipes
+            or options['ingredients_per_recipe'] > options['ingredients']
+            or options['tags'] < 2
+        ):
+            raise CommandError('Несогласованные размеры набора данных')
+        self.check_coverage()
+        self.png = make_png()
+        self.image = (
+            'data:image/png;base64,' + base64.b64encode(self.png).decode()
+        )
+        cache_backend = (
+            'django.core.cache.backends.locmem.LocMemCache'
+            if options['cache']
+            else 'django.core.cache.backends.dummy.DummyCache'
+        )
+        media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                CACHES={'default': {'BACKEND': cache_backend}},
+                MEDIA_ROOT=media_root,
+                IMAGE_PROCESSING_WORKERS=0
+            ):
+                results, failures = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        if failures:
+            raise CommandError(
+                'Превышен бюджет запросов: ' + ', '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Все сценарии уложились в бюджет запросов.'
+        ))
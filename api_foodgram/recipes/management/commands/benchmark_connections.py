@@ -0,0 +1,133 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from recipes.management.commands.benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность /api/tags/ без постоянных '
+        'соединений с БД и с ними.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--conn-max-age',
+            type=int,
+            default=60,
+            help='CONN_MAX_AGE для режимов с постоянными соединениями.'
+        )
+
+    def request(self, client, url):
+        close_old_connections()
+        try:
+            return client.get(url)
+        finally:
+            close_old_connections()
+
+    def count_connection(self, sender, **kwargs):
+        self.opened.append(sender)
+
+    def run_thread(self, url, count, warmup):
+        client = Client()
+        latencies = []
+        try:
+            for _ in range(warmup):
+                self.request(client, url)
+            for _ in range(count):
+                started = time.perf_counter()
+                response = self.request(client, url)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'{url} вернул статус {response.status_code}'
+                    )
+        finally:
+            connections.close_all()
+        return latencies
+
+    def run_mode(self, url, conn_max_age, health_checks, options):
+        database = connections.databases[DEFAULT_DB_ALIAS]
+        database['CONN_MAX_AGE'] = conn_max_age
+        database['CONN_HEALTH_CHECKS'] = health_checks
+        connections.close_all()
+        threads = options['threads']
+        count = options['requests'] // threads
+        self.opened = []
+        connection_created.connect(self.count_connection)
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(threads) as executor:
+                results = list(executor.map(
+                    lambda _: self.run_thread(url, count, options['warmup']),
+                    range(threads)
+                ))
+        finally:
+            connection_created.disconnect(self.count_connection)
+        elapsed = time.perf_counter() - started
+        latencies = [latency for result in results for latency in result]
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'connections': len(self.opened),
+        }
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < options['threads']:
+            raise CommandError(
+                'Запросов должно быть не меньше, чем потоков'
+            )
+        database = connections.databases[DEFAULT_DB_ALIAS]
+        saved = {
+            key: database.get(key)
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+        }
+        modes = (
+            ('CONN_MAX_AGE=0', 0, False),
+            (f'CONN_MAX_AGE={options["conn_max_age"]}',
+             options['conn_max_age'], False),
+            (f'CONN_MAX_AGE={options["conn_max_age"]} + проверка',
+             options['conn_max_age'], True),
+        )
+        url = reverse('api:tags-list')
+        setup_test_environment()
+        try:
+            with override_settings(
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+                }},
+                METRICS_ENABLED=False
+            ):
+                self.stdout.write(
+                    f'{"режим":<30} {"запр./с":>9} '
+                    f'{"p50, мс":>9} {"p95, мс":>9} {"соединений":>10}'
+                )
+                baseline = None
+                for label, conn_max_age, health_checks in modes:
+                    result = self.run_mode(
+                        url, conn_max_age, health_checks, options
+                    )
+                    baseline = baseline or result['rps']
+                    self.stdout.write(
+                        f'{label:<30} {result["rps"]:>9.1f} '
+                        f'{result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                        f'{result["connections"]:>10}'
+                        f'  x{result["rps"] / baseline:.2f}'
+                    )
+        finally:
+            database.update(saved)
+            connections.close_all()
+            teardown_test_environment()
+        self.stdout.write(self.style.SUCCESS('Замер завершён.'))
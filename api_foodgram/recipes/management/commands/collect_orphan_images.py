@@ -0,0 +1,70 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from api.constants import IMAGE_UPLOAD_TOKEN_MAX_AGE
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+
+def walk(storage, directory):
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = 'Удаляет картинки рецептов и миниатюры, оставшиеся без ссылок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=IMAGE_UPLOAD_TOKEN_MAX_AGE,
+            help='Не трогать файлы моложе указанного возраста.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+
+    def get_referenced(self):
+        referenced = set()
+        for image, thumbnails in Recipe.objects.values_list(
+            'image', 'thumbnails'
+        ).iterator():
+            referenced.add(image)
+            for sizes in thumbnails.values():
+                referenced.update(sizes.values())
+        return referenced
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(
+            seconds=options['grace_seconds']
+        )
+        referenced = self.get_referenced()
+        removed = 0
+        freed = 0
+        for name in walk(recipe_image_storage, 'recipes'):
+            if (
+                name in referenced
+                or recipe_image_storage.get_modified_time(name) > threshold
+            ):
+                continue
+            freed += recipe_image_storage.size(name)
+            removed += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                recipe_image_storage.delete(name)
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, {freed} байт.'
+        ))
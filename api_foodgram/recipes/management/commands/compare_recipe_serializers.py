@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.serializers import RecipeListSerializer, RecipeReadSerializer
+from api.views import RecipeViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает вывод и скорость RecipeReadSerializer '
+        'и RecipeListSerializer на странице рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого строится страница.'
+        )
+        parser.add_argument('--host', default='localhost')
+
+    def get_request(self, options):
+        request = APIRequestFactory().get(
+            '/api/recipes/', HTTP_HOST=options['host']
+        )
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError('Пользователь не найден')
+            force_authenticate(request, user)
+        request = Request(request)
+        if not options['user']:
+            request.user = AnonymousUser()
+        return request
+
+    def measure(self, serializer_class, recipes, request, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serializer_class(
+                recipes, many=True, context={'request': request}
+            ).data
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return JSONRenderer().render(data), best
+
+    def handle(self, *args, **options):
+        request = self.get_request(options)
+        view = RecipeViewSet(
+            request=request, format_kwarg=None, action='list'
+        )
+        recipes = list(view.get_queryset()[:options['limit']])
+        if not recipes:
+            raise CommandError('Нет рецептов для сравнения')
+
+        expected, reference_time = self.measure(
+            RecipeListSerializer, recipes, request, options['repeat']
+        )
+        actual, fast_time = self.measure(
+            RecipeReadSerializer, recipes, request, options['repeat']
+        )
+        if actual != expected:
+            raise CommandError('Вывод сериализаторов различается')
+        self.stdout.write(self.style.SUCCESS(
+            f'Вывод совпадает для {len(recipes)} рецептов. '
+            f'RecipeListSerializer: {reference_time * 1000:.2f} мс, '
+            f'RecipeReadSerializer: {fast_time * 1000:.2f} мс '
+            f'(быстрее в {reference_time / fast_time:.1f} раза).'
+        ))
@@ -0,0 +1,110 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (Favorite, IngredientInRecipe, Recipe, ShoppingCart,
+                            ShoppingCartItem)
+from users.models import Subscription
+
+User = get_user_model()
+
+INDEX_PATTERN = re.compile(r'(?:INDEX|[Uu]sing) (\w+)')
+
+
+class Command(BaseCommand):
+    help = 'Проверяет через EXPLAIN, что горячие запросы используют индексы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Вывести планы выполнения запросов.'
+        )
+
+    def get_hot_queries(self, user, recipe):
+        return (
+            (
+                'Рецепты автора по дате',
+                Recipe.objects.filter(author=user).order_by('-pub_date')
+            ),
+            (
+                'Лента рецептов (курсор)',
+                Recipe.objects.filter(
+                    pub_date__lt=recipe.pub_date
+                ).order_by('-pub_date', '-id')[:6]
+            ),
+            (
+                'Фильтр is_favorited',
+                Favorite.objects.filter(user=user).values('recipe_id')
+            ),
+            (
+                'Аннотация is_favorited',
+                Favorite.objects.filter(recipe=recipe, user=user)
+            ),
+            (
+                'Фильтр is_in_shopping_cart',
+                ShoppingCart.objects.filter(user=user).values('recipe_id')
+            ),
+            (
+                'Аннотация is_in_shopping_cart',
+                ShoppingCart.objects.filter(recipe=recipe, user=user)
+            ),
+            (
+                'Скачивание списка покупок',
+                ShoppingCartItem.objects.filter(user=user)
+            ),
+            (
+                'Ингредиенты рецепта',
+                IngredientInRecipe.objects.filter(recipe=recipe).values(
+                    'ingredient_id', 'amount'
+                )
+            ),
+            (
+                'Подписки пользователя (is_subscribed)',
+                Subscription.objects.filter(user=user).values('author_id')
+            ),
+            (
+                'Подписчики автора',
+                Subscription.objects.filter(author=user).values('user_id')
+            ),
+        )
+
+    @staticmethod
+    def is_sequential_scan(plan):
+        if connection.vendor == 'postgresql':
+            return 'Seq Scan' in plan
+        return any(
+            'SCAN' in line and 'USING' not in line
+            for line in plan.splitlines()
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        user = User.objects.order_by('id').first()
+        recipe = Recipe.objects.order_by('id').first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Для проверки нужны хотя бы один пользователь и один рецепт.'
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        missing = 0
+        for name, queryset in self.get_hot_queries(user, recipe):
+            plan = queryset.explain()
+            indexes = ', '.join(sorted(set(INDEX_PATTERN.findall(plan))))
+            if self.is_sequential_scan(plan):
+                missing += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: последовательное сканирование'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: {indexes}'))
+            if options['plans']:
+                self.stdout.write(plan)
+
+        if missing:
+            raise CommandError(f'Запросов без индекса: {missing}.')
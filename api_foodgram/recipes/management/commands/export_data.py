@@ -0,0 +1,160 @@
+import json
+import sys
+from base64 import b64encode
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from recipes.storage import recipe_image_storage
+from users.models import Subscription
+
+User = get_user_model()
+
+MODELS = ('tag', 'user', 'recipe', 'subscription', 'favorite', 'shopping_cart')
+
+
+def iterate_batches(queryset, batch_size):
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def recipe_key(recipe):
+    return [recipe.author.email, recipe.name, recipe.pub_date.isoformat()]
+
+
+class Command(BaseCommand):
+    help = 'Выгружает теги, пользователей, рецепты и связи в формате NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл для выгрузки (по умолчанию stdout).'
+        )
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=MODELS,
+            default=MODELS,
+            help='Какие данные выгружать.'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--no-images',
+            action='store_true',
+            help='Не встраивать содержимое картинок рецептов.'
+        )
+
+    def export_tag(self, batch_size, **options):
+        for batch in iterate_batches(Tag.objects.all(), batch_size):
+            for tag in batch:
+                yield {
+                    'model': 'tag',
+                    'name': tag.name,
+                    'color': tag.color,
+                    'slug': tag.slug,
+                }
+
+    def export_user(self, batch_size, **options):
+        for batch in iterate_batches(User.objects.all(), batch_size):
+            for user in batch:
+                yield {
+                    'model': 'user',
+                    'email': user.email,
+                    'username': user.username,
+                    'first_name': user.first_name,
+                    'last_name': user.last_name,
+                    'password': user.password,
+                    'is_active': user.is_active,
+                    'is_staff': user.is_staff,
+                    'is_superuser': user.is_superuser,
+                    'date_joined': user.date_joined.isoformat(),
+                }
+
+    def export_image(self, image, no_images):
+        data = {'name': image.name}
+        if not no_images and image.name and recipe_image_storage.exists(
+            image.name
+        ):
+            with recipe_image_storage.open(image.name, 'rb') as image_file:
+                data['content'] = b64encode(image_file.read()).decode()
+        return data
+
+    def export_recipe(self, batch_size, no_images, **options):
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'ingredients_in_recipe__ingredient', 'tags'
+        )
+        for batch in iterate_batches(queryset, batch_size):
+            for recipe in batch:
+                yield {
+                    'model': 'recipe',
+                    'key': recipe_key(recipe),
+                    'text': recipe.text,
+                    'cooking_time': recipe.cooking_time,
+                    'image': self.export_image(recipe.image, no_images),
+                    'tags': [tag.slug for tag in recipe.tags.all()],
+                    'ingredients': [
+                        [
+                            item.ingredient.name,
+                            item.ingredient.measurement_unit,
+                            item.amount
+                        ]
+                        for item in recipe.ingredients_in_recipe.all()
+                    ],
+                }
+
+    def export_subscription(self, batch_size, **options):
+        queryset = Subscription.objects.select_related('user', 'author')
+        for batch in iterate_batches(queryset, batch_size):
+            for subscription in batch:
+                yield {
+                    'model': 'subscription',
+                    'user': subscription.user.email,
+                    'author': subscription.author.email,
+                }
+
+    def export_relation(self, model, name, batch_size):
+        queryset = model.objects.select_related('user', 'recipe__author')
+        for batch in iterate_batches(queryset, batch_size):
+            for relation in batch:
+                yield {
+                    'model': name,
+                    'user': relation.user.email,
+                    'recipe': recipe_key(relation.recipe),
+                }
+
+    def export_favorite(self, batch_size, **options):
+        return self.export_relation(Favorite, 'favorite', batch_size)
+
+    def export_shopping_cart(self, batch_size, **options):
+        return self.export_relation(ShoppingCart, 'shopping_cart', batch_size)
+
+    def handle(self, *args, **options):
+        output = (
+            sys.stdout if options['output'] == '-'
+            else open(options['output'], 'w', encoding='utf-8')
+        )
+        exported = 0
+        try:
+            for name in MODELS:
+                if name not in options['models']:
+                    continue
+                for record in getattr(self, f'export_{name}')(**options):
+                    output.write(json.dumps(record, ensure_ascii=False))
+                    output.write('\n')
+                    exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено записей: {exported}.'
+        ))
@@ -0,0 +1,262 @@
+import json
+import os
+import sys
+from base64 import b64decode
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from api.cache import invalidate_cache
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingCartItem, Tag)
+from recipes.storage import recipe_image_storage
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def users_by_email(emails):
+    return User.objects.in_bulk(set(emails), field_name='email')
+
+
+def recipes_by_key(keys):
+    keys = set(keys)
+    authors = users_by_email(author for author, _, _ in keys)
+    recipes = {}
+    query = Q()
+    for author_email, name, pub_date in keys:
+        if author_email in authors:
+            query |= Q(
+                author=authors[author_email],
+                name=name,
+                pub_date=parse_datetime(pub_date)
+            )
+    if query:
+        for recipe in Recipe.objects.filter(query).select_related('author'):
+            recipes[(
+                recipe.author.email, recipe.name, recipe.pub_date.isoformat()
+            )] = recipe
+    return recipes
+
+
+class Command(BaseCommand):
+    help = 'Загружает данные, выгруженные командой export_data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            default='-',
+            help='Файл NDJSON (по умолчанию stdin).'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки для продолжения прерванной загрузки.'
+        )
+
+    def import_tag(self, records):
+        Tag.objects.bulk_create(
+            (
+                Tag(name=record['name'], color=record['color'],
+                    slug=record['slug'])
+                for record in records
+            ),
+            ignore_conflicts=True
+        )
+
+    def import_user(self, records):
+        User.objects.bulk_create(
+            (
+                User(
+                    email=record['email'],
+                    username=record['username'],
+                    first_name=record['first_name'],
+                    last_name=record['last_name'],
+                    password=record['password'],
+                    is_active=record['is_active'],
+                    is_staff=record['is_staff'],
+                    is_superuser=record['is_superuser'],
+                    date_joined=parse_datetime(record['date_joined'])
+                )
+                for record in records
+            ),
+            ignore_conflicts=True
+        )
+
+    def import_image(self, image):
+        name = image['name']
+        if 'content' in image and not recipe_image_storage.exists(name):
+            name = recipe_image_storage.save(
+                name, ContentFile(b64decode(image['content']))
+            )
+        return name
+
+    def read_record(self, row):
+        record = json.loads(row)
+        if record['model'] == 'recipe':
+            record['image'] = self.import_image(record['image'])
+        return record
+
+    def get_ingredients(self, records):
+        pairs = {
+            (name, measurement_unit)
+            for record in records
+            for name, measurement_unit, _ in record['ingredients']
+        }
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in pairs
+            ),
+            ignore_conflicts=True
+        )
+        return {
+            (ingredient.name, ingredient.measurement_unit): ingredient.id
+            for ingredient in Ingredient.objects.filter(
+                name__in={name for name, _ in pairs}
+            )
+        }
+
+    def import_recipe(self, records):
+        keys = [tuple(record['key']) for record in records]
+        existing = recipes_by_key(keys)
+        authors = users_by_email(author for author, _, _ in keys)
+        new_recipes = []
+        new_records = []
+        for key, record in zip(keys, records):
+            if key in existing or key[0] not in authors:
+                continue
+            existing[key] = None
+            new_records.append(record)
+            new_recipes.append(Recipe(
+                author=authors[key[0]],
+                name=key[1],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=record['image']
+            ))
+        if not new_recipes:
+            return
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(new_recipes)
+        else:
+            for recipe in new_recipes:
+                recipe.save()
+        for recipe, record in zip(new_recipes, new_records):
+            recipe.pub_date = parse_datetime(record['key'][2])
+        Recipe.objects.bulk_update(new_recipes, ('pub_date',))
+
+        tags = Tag.objects.in_bulk(
+            {slug for record in new_records for slug in record['tags']},
+            field_name='slug'
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[slug].id)
+            for recipe, record in zip(new_recipes, new_records)
+            for slug in record['tags']
+            if slug in tags
+        )
+        ingredients = self.get_ingredients(new_records)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredients[(name, measurement_unit)],
+                amount=amount
+            )
+            for recipe, record in zip(new_recipes, new_records)
+            for name, measurement_unit, amount in record['ingredients']
+        )
+
+    def import_subscription(self, records):
+        users = users_by_email(
+            email for record in records
+            for email in (record['user'], record['author'])
+        )
+        Subscription.objects.bulk_create(
+            (
+                Subscription(
+                    user=users[record['user']],
+                    author=users[record['author']]
+                )
+                for record in records
+                if record['user'] in users and record['author'] in users
+            ),
+            ignore_conflicts=True
+        )
+
+    def import_relation(self, model, records):
+        users = users_by_email(record['user'] for record in records)
+        recipes = recipes_by_key(tuple(record['recipe']) for record in records)
+        model.objects.bulk_create(
+            (
+                model(
+                    user=users[record['user']],
+                    recipe=recipes[tuple(record['recipe'])]
+                )
+                for record in records
+                if record['user'] in users
+                and tuple(record['recipe']) in recipes
+            ),
+            ignore_conflicts=True
+        )
+
+    def import_favorite(self, records):
+        self.import_relation(Favorite, records)
+
+    def import_shopping_cart(self, records):
+        self.import_relation(ShoppingCart, records)
+
+    def read_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['line']
+
+    def write_checkpoint(self, path, line):
+        if not path:
+            return
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'line': line}, f)
+        os.replace(f'{path}.tmp', path)
+
+    def handle(self, *args, **options):
+        source = (
+            sys.stdin if options['input'] == '-'
+            else open(options['input'], encoding='utf-8')
+        )
+        checkpoint = options['checkpoint']
+        line = self.read_checkpoint(checkpoint)
+        imported = set()
+        try:
+            records = (
+                self.read_record(row) for row in islice(source, line, None)
+            )
+            for name, group in groupby(records, key=lambda r: r['model']):
+                handler = getattr(self, f'import_{name}', None)
+                if handler is None:
+                    raise CommandError(f'Неизвестный тип записи: {name}')
+                batch = list(islice(group, options['batch_size']))
+                while batch:
+                    with transaction.atomic():
+                        handler(batch)
+                    line += len(batch)
+                    self.write_checkpoint(checkpoint, line)
+                    batch = list(islice(group, options['batch_size']))
+                imported.add(name)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        if imported & {'favorite', 'shopping_cart', 'recipe'}:
+            call_command('reconcile_recipe_counters', stdout=self.stdout)
+            ShoppingCartItem.objects.rebuild()
+        invalidate_cache('tags', 'ingredients', 'recipes')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загрузка завершена, обработано строк: {line}.'
+        ))
@@ -1,32 +1,114 @@
 import csv
+import json
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
-from django.db.utils import IntegrityError
+from django.core.management import BaseCommand, CommandError
 
+from api.cache import invalidate_cache
 from recipes.models import Ingredient
 
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    reader = csv.DictReader(file, fieldnames=['name', 'measurement_unit'])
+    yield from reader
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(JSON_CHUNK_SIZE), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидался JSON-массив ингредиентов')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield row
+    if buffer[position:].strip():
+        raise CommandError('Некорректный JSON в файле ингредиентов')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV- или JSON-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Путь к файлу (по умолчанию data/ingredients.<format>).'
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(READERS),
+            default='csv',
+            help='Формат файла.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке вставки.'
+        )
+
     def handle(self, *args, **options):
-        csv_file = 'ingredients.csv'
-        filepath = f'{settings.BASE_DIR}/data/{csv_file}'
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, fieldnames=['name', 'measurement_unit'])
-            imported = 0
-            for row in reader:
-                try:
-                    Ingredient.objects.create(
-                        name=row['name'],
-                        measurement_unit=row['measurement_unit']
+        file_format = options['format']
+        filepath = options['file'] or (
+            f'{settings.BASE_DIR}/data/ingredients.{file_format}'
+        )
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+
+        started = time.monotonic()
+        count_before = Ingredient.objects.count()
+        processed = 0
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                rows = (
+                    Ingredient(
+                        name=row['name'].strip(),
+                        measurement_unit=row['measurement_unit'].strip()
                     )
-                    imported += 1
-                except IntegrityError as e:
-                    self.stderr.write(
-                        self.style.ERROR(
-                            f'Не удалось импортировать файл: {e}'
-                        )
+                    for row in READERS[file_format](f)
+                )
+                batch = list(islice(rows, batch_size))
+                while batch:
+                    Ingredient.objects.bulk_create(
+                        batch, ignore_conflicts=True
                     )
-            self.stdout.write(self.style.SUCCESS(
-                f'{imported} ингредиентов успешно импортированы.'
-            ))
+                    processed += len(batch)
+                    batch = list(islice(rows, batch_size))
+        except (OSError, KeyError, TypeError, AttributeError) as e:
+            raise CommandError(f'Не удалось импортировать файл: {e}')
+
+        invalidate_cache('ingredients')
+        elapsed = time.monotonic() - started
+        imported = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported} ингредиентов успешно импортированы, '
+            f'{processed - imported} уже были в базе. '
+            f'Обработано {processed} строк за {elapsed:.2f} с '
+            f'({processed / max(elapsed, 1e-6):.0f} строк/с).'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand
+
+from recipes.models import ShoppingCartItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и сверяет сводные списки покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Только сверить таблицу с текущими списками покупок.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            ShoppingCartItem.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                'Сводные списки покупок пересчитаны.'
+            ))
+
+        expected = {
+            (item['user_id'], item['ingredient_id']): item['total_amount']
+            for item in ShoppingCartItem.objects.live_totals().iterator()
+        }
+        stored = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingCartItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            ).iterator()
+        }
+        mismatches = [
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        for user_id, ingredient_id in sorted(mismatches):
+            self.stderr.write(self.style.ERROR(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидалось {expected.get((user_id, ingredient_id), 0)}, '
+                f'в таблице {stored.get((user_id, ingredient_id), 0)}'
+            ))
+        if mismatches:
+            self.stderr.write(self.style.ERROR(
+                f'Найдено расхождений: {len(mismatches)}.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Расхождений нет, позиций: {len(stored)}.'
+            ))
@@ -0,0 +1,41 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe'
+            ).annotate(total=Count('id')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики избранного и списков покупок у рецептов.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        counters = {
+            'favorites_count': count_subquery(Favorite),
+            'cart_count': count_subquery(ShoppingCart),
+        }
+        mismatched = Recipe.objects.annotate(
+            actual_favorites_count=counters['favorites_count'],
+            actual_cart_count=counters['cart_count']
+        ).filter(
+            ~Q(favorites_count=F('actual_favorites_count'))
+            | ~Q(cart_count=F('actual_cart_count'))
+        ).count()
+        if mismatched:
+            Recipe.objects.update(**counters)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {mismatched}.'
+        ))
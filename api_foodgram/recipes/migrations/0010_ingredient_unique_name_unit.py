@@ -0,0 +1,60 @@
+# Generated by Django 3.2 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates.iterator():
+        keep_id = group['keep_id']
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        for model, owner in (
+            (IngredientInRecipe, 'recipe_id'),
+            (ShoppingCartItem, 'user_id'),
+        ):
+            amount_field = (
+                'amount' if model is IngredientInRecipe else 'total_amount'
+            )
+            for row in model.objects.filter(ingredient_id__in=duplicate_ids):
+                kept = model.objects.filter(
+                    **{owner: getattr(row, owner)}, ingredient_id=keep_id
+                ).first()
+                if kept is None:
+                    row.ingredient_id = keep_id
+                    row.save(update_fields=('ingredient',))
+                else:
+                    setattr(
+                        kept,
+                        amount_field,
+                        getattr(kept, amount_field) + getattr(row, amount_field)
+                    )
+                    kept.save(update_fields=(amount_field,))
+                    row.delete()
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='check_unable_to_add_duplicate_ingredient'),
+        ),
+    ]
@@ -1,13 +1,35 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
 
 from recipes.constants import (MEAS_UNIT_MAX_LEN, NAME_MAX_LEN, SLUG_MAX_LEN,
                                STR_MAX_LEN)
+from recipes.storage import recipe_image_storage
 
 User = get_user_model()
 
+detached_recipe_ids = ContextVar('detached_recipe_ids', default=frozenset())
+
+
+@contextmanager
+def detach_cart_items(*recipe_ids):
+    token = detached_recipe_ids.set(
+        detached_recipe_ids.get() | set(recipe_ids)
+    )
+    try:
+        yield
+    finally:
+        detached_recipe_ids.reset(token)
+
+
+def is_detached(recipe_id):
+    return recipe_id in detached_recipe_ids.get()
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -23,6 +45,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингреидиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                name='check_unable_to_add_duplicate_ingredient',
+                fields=('name', 'measurement_unit')
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -48,6 +76,12 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def delete(self):
+        with detach_cart_items(*self.values_list('pk', flat=True)):
+            return super().delete()
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -61,8 +95,15 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=recipe_image_storage,
+        db_index=True,
         verbose_name='Картинка'
     )
+    thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Миниатюры картинки'
+    )
     text = models.TextField(verbose_name='Текстовое описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -90,15 +131,40 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в избранное',
+        db_index=True
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавлений в список покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                name='recipe_author_pub_date_idx',
+                fields=('author', '-pub_date')
+            ),
+            models.Index(
+                name='recipe_pub_date_id_idx',
+                fields=('-pub_date', '-id')
+            ),
+        )
 
     def __str__(self):
         return self.name[:STR_MAX_LEN]
 
+    def delete(self, *args, **kwargs):
+        with detach_cart_items(self.pk):
+            return super().delete(*args, **kwargs)
+
 
 class IngredientInRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -132,6 +198,13 @@ class IngredientInRecipe(models.Model):
                 fields=('recipe', 'ingredient')
             ),
         )
+        indexes = (
+            models.Index(
+                name='ingredient_in_recipe_cover_idx',
+                fields=('recipe',),
+                include=('ingredient', 'amount')
+            ),
+        )
 
     def __str__(self):
         return f'{self.ingredient} - {self.amount}'
@@ -160,6 +233,12 @@ class Favorite(models.Model):
                 fields=('user', 'recipe')
             ),
         )
+        indexes = (
+            models.Index(
+                name='favorite_recipe_user_idx',
+                fields=('recipe', 'user')
+            ),
+        )
 
 
 class ShoppingCart(models.Model):
@@ -185,3 +264,119 @@ class ShoppingCart(models.Model):
                 fields=('user', 'recipe')
             ),
         )
+        indexes = (
+            models.Index(
+                name='shopping_cart_recipe_user_idx',
+                fields=('recipe', 'user')
+            ),
+        )
+
+
+class ShoppingCartItemManager(models.Manager):
+    def live_totals(self):
+        return IngredientInRecipe.objects.filter(
+            recipe__added_to_shopping_carts__isnull=False
+        ).values(
+            'ingredient_id',
+            user_id=F('recipe__added_to_shopping_carts__user')
+        ).annotate(total_amount=Sum('amount')).order_by()
+
+    @transaction.atomic
+    def apply_deltas(self, deltas):
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        user_ids, ingredient_ids = zip(*deltas)
+        list(User.objects.select_for_update().filter(
+            id__in=set(user_ids)
+        ).order_by('id').values_list('id', flat=True))
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in self.select_for_update().filter(
+                user_id__in=set(user_ids),
+                ingredient_id__in=set(ingredient_ids)
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for (user_id, ingredient_id), delta in deltas.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    to_create.append(self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=delta
+                    ))
+            elif item.total_amount + delta > 0:
+                item.total_amount += delta
+                to_update.append(item)
+            else:
+                to_delete.append(item.id)
+
+        if to_delete:
+            self.filter(id__in=to_delete).delete()
+        if to_update:
+            self.bulk_update(to_update, ('total_amount',))
+        if to_create:
+            self.bulk_create(to_create)
+
+    def add_recipe(self, user_id, recipe_id, sign=1):
+        self.apply_deltas({
+            (user_id, ingredient_id): sign * amount
+            for ingredient_id, amount in IngredientInRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        })
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.add_recipe(user_id, recipe_id, sign=-1)
+
+    def apply_recipe_changes(self, recipe_id, ingredient_deltas):
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+        self.apply_deltas({
+            (user_id, ingredient_id): delta
+            for user_id in user_ids
+            for ingredient_id, delta in ingredient_deltas.items()
+        })
+
+    @transaction.atomic
+    def rebuild(self):
+        self.all().delete()
+        self.bulk_create(
+            self.model(**totals) for totals in self.live_totals().iterator()
+        )
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    objects = ShoppingCartItemManager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = (
+            models.UniqueConstraint(
+                name='check_unable_to_add_ingredient_to_cart_more_than_once',
+                fields=('user', 'ingredient')
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total_amount}'
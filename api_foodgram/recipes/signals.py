@@ -0,0 +1,80 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from recipes.models import (Favorite, IngredientInRecipe, Recipe, ShoppingCart,
+                            ShoppingCartItem, is_detached)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_deleted_recipe_from_carts(sender, instance, **kwargs):
+    if is_detached(instance.pk):
+        ShoppingCartItem.objects.apply_recipe_changes(instance.pk, {
+            ingredient_id: -amount
+            for ingredient_id, amount in IngredientInRecipe.objects.filter(
+                recipe_id=instance.pk
+            ).values_list('ingredient_id', 'amount')
+        })
+
+
+def change_counter(recipe_id, counter, delta):
+    Recipe.objects.filter(pk=recipe_id).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def increase_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrease_favorites_count(sender, instance, **kwargs):
+    change_counter(instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_cart(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance.recipe_id, 'cart_count', 1)
+        ShoppingCartItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_cart(sender, instance, **kwargs):
+    change_counter(instance.recipe_id, 'cart_count', -1)
+    if not is_detached(instance.recipe_id):
+        ShoppingCartItem.objects.remove_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_previous_amount(sender, instance, **kwargs):
+    instance.previous = None
+    if instance.pk is not None:
+        instance.previous = IngredientInRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def apply_ingredient_change(sender, instance, **kwargs):
+    deltas = {instance.ingredient_id: instance.amount}
+    if instance.previous is not None:
+        ingredient_id, amount = instance.previous
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+    ShoppingCartItem.objects.apply_recipe_changes(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def apply_ingredient_removal(sender, instance, **kwargs):
+    if not is_detached(instance.recipe_id):
+        ShoppingCartItem.objects.apply_recipe_changes(
+            instance.recipe_id, {instance.ingredient_id: -instance.amount}
+        )
@@ -0,0 +1,37 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name)
+        stem, extension = posixpath.splitext(filename)
+        if stem == digest:
+            while posixpath.basename(directory) == digest[:2]:
+                directory = posixpath.dirname(directory)
+        return posixpath.join(
+            directory, digest[:2], f'{digest}{extension.lower()}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = self.hashed_name(name, digest.hexdigest())
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return self._save(name, content)
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -72,3 +72,9 @@ class Subscription(models.Model):
                 check=~Q(user=F('author'))
             ),
         )
+        indexes = (
+            models.Index(
+                name='subscription_author_user_idx',
+                fields=('author', 'user')
+            ),
+        )
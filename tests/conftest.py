@@ -0,0 +1,102 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_PROCESSING_WORKERS = 0
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        email='user@foodgram.local',
+        username='user',
+        first_name='Иван',
+        last_name='Иванов',
+        password='Test-password-1'
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        email='author@foodgram.local',
+        username='author',
+        first_name='Мария',
+        last_name='Петрова',
+        password='Test-password-1'
+    )
+
+
+def get_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    return get_client(user)
+
+
+@pytest.fixture
+def author_client(author):
+    return get_client(author)
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast'),
+        Tag.objects.create(name='Обед', color='#49B64E', slug='lunch'),
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (('Мука', 'г'), ('Молоко', 'мл'), ('Яйца', 'шт'))
+    ]
+
+
+@pytest.fixture
+def recipes(author, user, tags, ingredients):
+    recipes = []
+    for number in range(3):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text='Описание',
+            cooking_time=10 + number,
+            image=f'recipes/ab/recipe-{number}.png'
+        )
+        recipe.tags.set(tags[:number + 1])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, ingredient=ingredient, amount=number + 1
+            )
+            for ingredient in ingredients[number:]
+        )
+        recipes.append(recipe)
+    Recipe.objects.filter(pk=recipes[0].pk).update(thumbnails={'webp': {
+        '320': 'recipes/thumbnails/recipe-0_320.webp',
+        '640': 'recipes/thumbnails/recipe-0_640.webp',
+    }})
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    Subscription.objects.create(user=user, author=author)
+    return recipes
@@ -0,0 +1,50 @@
+import json
+from base64 import b64encode
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.management.commands.import_data import Command
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+
+@pytest.mark.django_db
+def test_import_stores_images_before_batching(
+    monkeypatch, tmp_path, author, ingredients
+):
+    content = b'\x89PNG' + bytes(range(256)) * 64
+    dump = tmp_path / 'dump.ndjson'
+    dump.write_text(''.join(
+        json.dumps({
+            'model': 'recipe',
+            'key': [author.email, f'Импорт {number}',
+                    '2023-01-01T00:00:00+00:00'],
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': {
+                'name': f'recipes/import-{number}.png',
+                'content': b64encode(content).decode(),
+            },
+            'tags': [],
+            'ingredients': [[ingredients[0].name, 'г', 2]],
+        }) + '\n'
+        for number in range(3)
+    ), encoding='utf-8')
+    batches = []
+    original = Command.import_recipe
+
+    def import_recipe(self, records):
+        batches.append([record['image'] for record in records])
+        return original(self, records)
+
+    monkeypatch.setattr(Command, 'import_recipe', import_recipe)
+    call_command('import_data', input=str(dump), stdout=StringIO())
+
+    assert all(isinstance(image, str) for batch in batches for image in batch)
+    recipes = Recipe.objects.filter(name__startswith='Импорт')
+    assert recipes.count() == 3
+    assert {recipe.image.name for recipe in recipes} == set(batches[0])
+    with recipe_image_storage.open(recipes[0].image.name) as image:
+        assert image.read() == content
@@ -0,0 +1,18 @@
+import pytest
+from django.db import connection
+
+from recipes.management.commands.explain_hot_queries import Command
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes(user, recipes):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    command = Command()
+    sequential = [
+        name for name, queryset in command.get_hot_queries(user, recipes[0])
+        if command.is_sequential_scan(queryset.explain())
+    ]
+
+    assert not sequential, f'Запросы без индекса: {", ".join(sequential)}'
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def close_recipes(author):
+    started = timezone.now()
+    recipe_ids = []
+    for number in range(4):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Курсор {number}',
+            text='Описание',
+            cooking_time=1,
+            image='recipes/ab/cursor.png'
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(
+            pub_date=started + timedelta(microseconds=100 * number)
+        )
+        recipe_ids.append(recipe.pk)
+    return recipe_ids
+
+
+@pytest.mark.django_db
+def test_cursor_walks_recipes_published_microseconds_apart(
+    author, close_recipes
+):
+    client = APIClient()
+    url = f'/api/recipes/?author={author.id}&limit=1&cursor='
+    seen = []
+    while url and len(seen) <= len(close_recipes):
+        data = client.get(url).json()
+        seen.extend(recipe['id'] for recipe in data['results'])
+        url = data['next']
+
+    assert seen == close_recipes[::-1]
+
+
+@pytest.mark.django_db
+def test_cursor_rejects_ordering(author, close_recipes):
+    response = APIClient().get(
+        f'/api/recipes/?author={author.id}&cursor=&ordering=pub_date'
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart, detach_cart_items
+
+
+def get_counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.cart_count
+
+
+@pytest.mark.django_db
+def test_counters_follow_model_writes(user, author, recipes):
+    recipe = recipes[2]
+    Favorite.objects.create(user=user, recipe=recipe)
+    Favorite.objects.create(user=author, recipe=recipe)
+    ShoppingCart.objects.create(user=author, recipe=recipe)
+    assert get_counters(recipe) == (2, 1)
+
+    Favorite.objects.filter(user=author, recipe=recipe).delete()
+    assert get_counters(recipe) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_counters_are_not_skipped_for_detached_recipe(user, author, recipes):
+    recipe = recipes[2]
+    with detach_cart_items(recipe.pk):
+        Favorite.objects.create(user=user, recipe=recipe)
+        Favorite.objects.create(user=author, recipe=recipe)
+
+    assert get_counters(recipe) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_stale_counters_stay_at_zero(user_client, recipes):
+    recipe = recipes[2]
+    response = user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert response.status_code == 201
+    response = user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert response.status_code == 201
+    assert get_counters(recipe) == (1, 1)
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=0, cart_count=0
+    )
+
+    for action in ('favorite', 'shopping_cart'):
+        response = user_client.delete(f'/api/recipes/{recipe.id}/{action}/')
+        assert response.status_code == 204
+    assert get_counters(recipe) == (0, 0)
@@ -0,0 +1,65 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.serializers import RecipeListSerializer, RecipeReadSerializer
+from api.views import RecipeViewSet
+
+
+def get_request(user=None):
+    request = APIRequestFactory().get('/api/recipes/')
+    if user is not None:
+        force_authenticate(request, user)
+    request = Request(request)
+    if user is None:
+        request.user = AnonymousUser()
+    return request
+
+
+def render(serializer_class, instance, request, many):
+    return JSONRenderer().render(serializer_class(
+        instance, many=many, context={'request': request}
+    ).data)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_read_serializer_matches_list_serializer(
+    authenticated, user, recipes
+):
+    request = get_request(user if authenticated else None)
+    view = RecipeViewSet(request=request, format_kwarg=None, action='list')
+    page = list(view.get_queryset())
+
+    assert render(RecipeReadSerializer, page, request, many=True) == render(
+        RecipeListSerializer, page, request, many=True
+    )
+    assert render(
+        RecipeReadSerializer, page[0], request, many=False
+    ) == render(RecipeListSerializer, page[0], request, many=False)
+
+
+@pytest.mark.django_db
+def test_write_response_matches_read_response(author_client, recipes):
+    recipe = recipes[0]
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {
+            'tags': [tag.id for tag in recipe.tags.all()],
+            'ingredients': [
+                {'id': item.ingredient_id, 'amount': item.amount + 1}
+                for item in recipe.ingredients_in_recipe.all()
+            ],
+            'name': 'Новое название',
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        },
+        format='json'
+    )
+
+    assert response.status_code == 200
+    assert response.json() == author_client.get(
+        f'/api/recipes/{recipe.id}/'
+    ).json()
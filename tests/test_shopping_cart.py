@@ -0,0 +1,105 @@
+import threading
+from unittest import mock
+
+import pytest
+from django.db import DatabaseError
+
+from recipes.models import (IngredientInRecipe, Recipe, ShoppingCart,
+                            ShoppingCartItem, detach_cart_items, is_detached)
+
+
+def assert_cart_items_match():
+    live = {
+        (totals['user_id'], totals['ingredient_id']): totals['total_amount']
+        for totals in ShoppingCartItem.objects.live_totals()
+    }
+    stored = {
+        (item.user_id, item.ingredient_id): item.total_amount
+        for item in ShoppingCartItem.objects.all()
+    }
+    assert stored == live
+
+
+@pytest.fixture
+def carts(user, author, recipes):
+    for recipe in recipes:
+        ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+        ShoppingCart.objects.create(user=author, recipe=recipe)
+
+
+@pytest.mark.django_db
+def test_cart_items_follow_model_changes(user, recipes, ingredients, carts):
+    ingredient_in_recipe = IngredientInRecipe.objects.filter(
+        recipe=recipes[1]
+    ).first()
+    ingredient_in_recipe.amount += 7
+    ingredient_in_recipe.save()
+    IngredientInRecipe.objects.create(
+        recipe=recipes[1], ingredient=ingredients[0], amount=3
+    )
+    IngredientInRecipe.objects.filter(recipe=recipes[1]).exclude(
+        pk=ingredient_in_recipe.pk
+    ).last().delete()
+    ShoppingCart.objects.filter(user=user, recipe=recipes[0]).delete()
+
+    assert_cart_items_match()
+
+
+@pytest.mark.django_db
+def test_cart_items_follow_recipe_update(
+    author_client, recipes, ingredients, carts
+):
+    recipe = recipes[0]
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {
+            'tags': [tag.id for tag in recipe.tags.all()],
+            'ingredients': [
+                {'id': ingredients[0].id, 'amount': 5},
+                {'id': ingredients[2].id, 'amount': 2},
+            ],
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        },
+        format='json'
+    )
+
+    assert response.status_code == 200
+    assert_cart_items_match()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('delete', (
+    lambda recipe: recipe.delete(),
+    lambda recipe: Recipe.objects.filter(pk=recipe.pk).delete(),
+    lambda recipe: recipe.author.delete(),
+), ids=('instance', 'queryset', 'author'))
+def test_cart_items_follow_recipe_deletion(delete, recipes, carts):
+    delete(recipes[0])
+
+    assert_cart_items_match()
+    assert not is_detached(recipes[0].pk)
+
+
+@pytest.mark.django_db
+def test_failed_recipe_deletion_does_not_detach_recipe(user, recipes, carts):
+    with mock.patch(
+        'django.db.models.sql.DeleteQuery.delete_batch',
+        side_effect=DatabaseError
+    ), pytest.raises(DatabaseError):
+        recipes[0].delete()
+
+    assert not is_detached(recipes[0].pk)
+
+
+def test_detached_recipes_are_local_to_thread():
+    seen = []
+    with detach_cart_items(1):
+        thread = threading.Thread(target=lambda: seen.append(is_detached(1)))
+        thread.start()
+        thread.join()
+        assert is_detached(1)
+
+    assert seen == [False]
+    assert not is_detached(1)